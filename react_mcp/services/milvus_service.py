@@ -3,7 +3,9 @@
 import os
 import logging
 import asyncio
-import json # Added for JSON handling
+import time
+import unicodedata
+from collections import OrderedDict
 from pymilvus import (
     connections,
     utility,
@@ -15,7 +17,7 @@ from pymilvus import (
 )
 from pymilvus.exceptions import MilvusException, CollectionNotExistException, IndexNotExistException
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Optional
 
 load_dotenv() # Load environment variables from .env file
 
@@ -39,6 +41,22 @@ VECTOR_INDEX_PARAMS = {
 }
 MILVUS_INDEX_NAME = "vector_hnsw_index"
 
+# Process-wide TTL LRU of texts known to exist in the collection (positive results only; the TTL
+# bounds staleness if rows are ever deleted out of band)
+KNOWN_TEXT_CACHE_SIZE = 50000
+KNOWN_TEXT_CACHE_TTL = 3600  # seconds
+
+
+# Version of normalize_text's output. Bump it with any change to normalize_text: stored forms derived from
+# it (Neo4j r.value_lower) are migrated once per version at startup (see Neo4jService.create_indexes)
+NORMALIZE_TEXT_VERSION = 1
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a text, shared by embedding/cache keys, Milvus original_text and Neo4j value_lower:
+       NFKC, casefolded, whitespace collapsed. Variants differing only in case, spacing or Unicode
+       compatibility forms ("Seoul" / "seoul ") map to one key. Punctuation is kept ("C++" vs "C")."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
 
 # --- Sync Helper Functions for Milvus (thread-safe operations) ---
 
@@ -77,6 +95,20 @@ def _sync_insert_vectors(collection: Collection, data: List[Dict[str, Any]]) ->
         logger.error(f"Failed to insert vectors into Milvus: {e}", exc_info=True)
         raise
 
+def _sync_upsert_vectors(collection: Collection, data: List[Dict[str, Any]]) -> List[Any]:
+    """Upsert multiple vectors keyed on original_text into Milvus, returning their primary keys."""
+    try:
+        logger.debug(f"Upserting {len(data)} vectors into Milvus collection '{MILVUS_COLLECTION_NAME}'...")
+        mutation_result = collection.upsert(data)
+        upserted_ids = mutation_result.primary_keys
+        logger.info(f"Successfully upserted {len(upserted_ids)} vectors. Example ID: {upserted_ids[0] if upserted_ids else 'N/A'}")
+        collection.flush()  # Ensure persistence
+        logger.debug("Milvus collection flushed after upsert.")
+        return upserted_ids
+    except MilvusException as e:
+        logger.error(f"Failed to upsert vectors into Milvus: {e}", exc_info=True)
+        raise
+
 def _sync_search_vectors(collection: Collection, search_vectors: List[List[float]], top_k: int, similarity_threshold: float) -> List[Dict[str, Any]]:
     """Perform a cosine similarity search for given vectors, filtering by threshold and returning top hits."""
     search_params = {
@@ -137,7 +169,7 @@ def _sync_search_vectors(collection: Collection, search_vectors: List[List[float
 
 def _sync_get_vector_id_by_text(collection: Collection, text: str) -> Optional[int]:
     """Retrieve Milvus vector ID for an exact original_text match, or None if not found."""
-    normalized_text = text.strip().lower()
+    normalized_text = normalize_text(text)
     if not normalized_text:
         logger.warning("Attempted to search Milvus by empty/whitespace text.")
         return None
@@ -161,13 +193,13 @@ def _sync_get_vector_id_by_text(collection: Collection, text: str) -> Optional[i
             first_hit = results[0][0]
             original_text = first_hit.entity.get(MILVUS_TEXT_FIELD)
             if original_text:
-                logger.info(f"Found existing Milvus vector for text: '{original_text[:50]}...'") # Changed level to INFO
+                logger.debug("Found existing Milvus vector for text: %.50r", original_text) # Per-text; lazy so it costs nothing below DEBUG
                 return original_text
             else:
-                logger.info(f"No existing Milvus vector found for text: '{normalized_text[:50]}...'") # Changed level to INFO
+                logger.debug("No existing Milvus vector found for text: %.50r", normalized_text)
                 return None
         else:
-            logger.info(f"No existing Milvus vector found for text: '{normalized_text[:50]}...'") # Changed level to INFO
+            logger.debug("No existing Milvus vector found for text: %.50r", normalized_text)
             return None
     except MilvusException as e:
         logger.error(f"Milvus error searching by text '{normalized_text[:50]}...': {e}", exc_info=True)
@@ -176,6 +208,23 @@ def _sync_get_vector_id_by_text(collection: Collection, text: str) -> Optional[i
         logger.error(f"Unexpected error searching Milvus by text '{normalized_text[:50]}...': {e}", exc_info=True)
         return None
 
+def _escape_expr_string(text: str) -> str:
+    """Escape backslashes and double quotes so text can be embedded in a Milvus string literal."""
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
+def _sync_get_vector_ids_by_texts(collection: Collection, texts: List[str]) -> Dict[str, str]:
+    """Look up many exact original_text matches with a single Milvus query, returning {text: id}."""
+    expr_values = ", ".join(f'"{_escape_expr_string(text)}"' for text in texts)
+    expr = f'{MILVUS_TEXT_FIELD} in [{expr_values}]'
+    try:
+        rows = collection.query(expr=expr, output_fields=[MILVUS_TEXT_FIELD])
+        found = {row[MILVUS_TEXT_FIELD]: row[MILVUS_TEXT_FIELD] for row in rows if row.get(MILVUS_TEXT_FIELD)}
+        logger.debug(f"Milvus batch text lookup found {len(found)}/{len(texts)} existing vectors.")
+        return found
+    except MilvusException as e:
+        logger.error(f"Milvus error in batch text lookup for {len(texts)} texts: {e}", exc_info=True)
+        raise
+
 # --- MilvusService Class ---
 ### Core class: MilvusService - vector store lifecycle and operations
 class MilvusService:
@@ -185,6 +234,29 @@ class MilvusService:
         self._port = os.getenv("MILVUS_PORT", "19530")
         self._alias = "default"
         self._collection: Collection | None = None
+        # {normalized text: (expires_at, id)}; the primary key is the text itself
+        self._known_ids: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+    def _known_id_get(self, text: str) -> Optional[str]:
+        """Return the cached ID for a normalized text if known and not expired."""
+        entry = self._known_ids.get(text)
+        if entry is None:
+            return None
+        expires_at, vector_id = entry
+        if expires_at < time.monotonic():
+            del self._known_ids[text]
+            return None
+        self._known_ids.move_to_end(text)
+        return vector_id
+
+    def _known_ids_put(self, ids: Dict[str, str]):
+        """Remember texts confirmed to exist in Milvus, evicting the least recently used entries."""
+        expires_at = time.monotonic() + KNOWN_TEXT_CACHE_TTL
+        for text, vector_id in ids.items():
+            self._known_ids[text] = (expires_at, vector_id)
+            self._known_ids.move_to_end(text)
+        while len(self._known_ids) > KNOWN_TEXT_CACHE_SIZE:
+            self._known_ids.popitem(last=False)
 
     def _get_collection_schema(self) -> CollectionSchema:
         # Define fields with original_text as primary key to enforce uniqueness
@@ -324,11 +396,11 @@ class MilvusService:
         # Prepare data in the format Milvus expects (list of dicts matching schema fields)
         prepared_data = []
         for item in vectors_data:
-            # Only include fields defined in the simplified schema, ensure text is lowercase
+            # Only include fields defined in the simplified schema, ensure text is normalized
             data_entry = {
                 MILVUS_VECTOR_FIELD: item["embedding"],
                 MILVUS_ELEMENT_TYPE_FIELD: item["element_type"],
-                MILVUS_TEXT_FIELD: item["original_text"].lower()
+                MILVUS_TEXT_FIELD: normalize_text(item["original_text"])
             }
             prepared_data.append(data_entry)
 
@@ -337,12 +409,44 @@ class MilvusService:
             inserted_ids = await asyncio.to_thread(
                 _sync_insert_vectors, self._collection, prepared_data
             )
+            if inserted_ids:
+                self._known_ids_put({entry[MILVUS_TEXT_FIELD]: entry[MILVUS_TEXT_FIELD] for entry in prepared_data})
             return inserted_ids
         except Exception as e:
             # Error is logged within _sync_insert_vectors or asyncio wrapper
             logger.error(f"Failed to insert vectors via thread: {e}")
             return [] # Return empty list on failure
 
+    async def upsert_vectors(self, vectors_data: List[Dict[str, Any]]) -> List[Any]:
+        """Idempotently write vectors keyed on original_text in a background thread and return IDs.
+           Concurrent writers of the same text overwrite each other instead of creating duplicates."""
+        if not self._collection:
+            logger.error("Milvus collection is not initialized. Cannot upsert vectors.")
+            raise ConnectionError("Milvus collection not available")
+        if not vectors_data:
+            logger.warning("upsert_vectors called with empty data list.")
+            return []
+
+        prepared_data = [
+            {
+                MILVUS_VECTOR_FIELD: item["embedding"],
+                MILVUS_ELEMENT_TYPE_FIELD: item["element_type"],
+                MILVUS_TEXT_FIELD: normalize_text(item["original_text"])
+            }
+            for item in vectors_data
+        ]
+
+        try:
+            upserted_ids = await asyncio.to_thread(
+                _sync_upsert_vectors, self._collection, prepared_data
+            )
+            if upserted_ids:
+                self._known_ids_put({entry[MILVUS_TEXT_FIELD]: entry[MILVUS_TEXT_FIELD] for entry in prepared_data})
+            return upserted_ids
+        except Exception as e:
+            logger.error(f"Failed to upsert vectors via thread: {e}")
+            return [] # Return empty list on failure
+
     async def search_vectors(self, query_embeddings: List[List[float]], top_k: int = 5, similarity_threshold: float = 0.75) -> List[Dict[str, Any]]:
         """Perform a vector similarity search in Milvus in a background thread."""
         if not self._collection:
@@ -370,19 +474,57 @@ class MilvusService:
             raise ConnectionError("Milvus collection not available")
         
         # Normalize text before passing to sync function
-        normalized_text = text.strip().lower() if text else ""
+        normalized_text = normalize_text(text) if text else ""
         if not normalized_text:
             logger.warning("get_vector_id_by_text called with empty/whitespace text.")
             return None
-        
+        cached_id = self._known_id_get(normalized_text)
+        if cached_id is not None:
+            return cached_id
+
         try:
             original_text = await asyncio.to_thread(
                 _sync_get_vector_id_by_text, self._collection, normalized_text
             )
+            if original_text is not None:
+                self._known_ids_put({normalized_text: original_text})
             return original_text
         except Exception as e:
             logger.error(f"Failed to get vector ID by text '{normalized_text[:50]}...' via thread: {e}")
             return None
 
+    async def get_vector_ids_by_texts(self, texts: List[str]) -> Dict[str, str]:
+        """Fetch IDs for many texts in one round-trip; keys are the normalized (see normalize_text) texts found.
+           Texts already known to exist are answered from the in-process cache without querying Milvus."""
+        if not self._collection:
+            logger.error("Milvus collection is not initialized. Cannot search vectors by text.")
+            raise ConnectionError("Milvus collection not available")
+
+        normalized_texts = list(dict.fromkeys(key for key in (normalize_text(t) for t in texts if t) if key))
+        if not normalized_texts:
+            return {}
+
+        found: Dict[str, str] = {}
+        missing_texts = []
+        for text in normalized_texts:
+            cached_id = self._known_id_get(text)
+            if cached_id is not None:
+                found[text] = cached_id
+            else:
+                missing_texts.append(text)
+        if not missing_texts:
+            return found
+
+        try:
+            queried = await asyncio.to_thread(
+                _sync_get_vector_ids_by_texts, self._collection, missing_texts
+            )
+            self._known_ids_put(queried)
+            found.update(queried)
+            return found
+        except Exception as e:
+            logger.error(f"Failed to get vector IDs for {len(missing_texts)} texts via thread: {e}")
+            raise
+
 # Create a singleton instance of the service
 milvus_service = MilvusService() 
\ No newline at end of file
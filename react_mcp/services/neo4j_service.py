@@ -1,19 +1,24 @@
 """Neo4j service module: manages async connections and queries to the knowledge graph, handles OpenAI embedding generation with Redis caching, and integrates Milvus vector store operations."""
 
 import os
-from neo4j import AsyncGraphDatabase, AsyncDriver, AsyncSession
+from neo4j import AsyncGraphDatabase, AsyncDriver, AsyncSession, RoutingControl
 from dotenv import load_dotenv
 import logging
 from typing import List, Any, Dict, Tuple
 import asyncio
-from functools import partial
-from openai import AsyncOpenAI, OpenAIError
+from functools import lru_cache
+from openai import AsyncOpenAI, OpenAIError, DefaultAsyncHttpxClient
+import httpx
 from datetime import datetime
-import json  # JSON utilities for serialization
+from array import array  # Packed float32 buffers for the embedding cache
+import hashlib
+import time
+from collections import OrderedDict
+from itertools import chain
 import redis.asyncio as aioredis  # Async Redis client for embedding cache
 
 # Import Milvus vector store client and embedding configuration
-from .milvus_service import milvus_service, EMBEDDING_DIMENSION, OPENAI_EMBEDDING_MODEL  # Milvus client and embedding config
+from .milvus_service import milvus_service, normalize_text, NORMALIZE_TEXT_VERSION, OPENAI_EMBEDDING_MODEL  # Milvus client, shared text normalization and embedding config
 
 # Load environment variables for Neo4j and Redis
 load_dotenv()
@@ -23,10 +28,191 @@ logger = logging.getLogger(__name__)
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+# Explicit database name on every session skips the driver's home-database resolution round-trip
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+# Driver connection pool sizing, tunable for concurrent request load
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQ_TIMEOUT = float(os.getenv("NEO4J_ACQ_TIMEOUT", "60"))  # seconds to wait for a pooled connection
+NEO4J_MAX_CONNECTION_LIFETIME = 3600  # seconds
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "5"))  # seconds to establish a new connection
+
+# find_similar_information result cache (per service instance, invalidated per user on writes)
+CONTEXT_CACHE_SIZE = 1024
+CONTEXT_CACHE_TTL = 60  # seconds
+
+# Shape of the rows find_similar_information formats, as produced by _query_context_records:
+# (rel_id, relationship, node_key, node_value, created_at, lifetime, parent_relationship, parent_value)
+CONTEXT_ROW = Tuple[str, str, str, str, Any, str, str | None, str | None]
+
+# Per-user set of normalized RELATES_TO values (r.value_lower), used to drop edge-probe texts (Query 3) that can't match
+REL_VALUES_CACHE_SIZE = 1024  # users kept in memory
+# Above this many distinct values the Python substring scan (probes x values) stops paying for itself versus
+# letting Query 3 probe the TEXT index, so the query returns null and the prefilter is skipped
+REL_VALUES_PREFILTER_MAX = 64
+USER_REL_VALUES_QUERY = (
+    "MATCH (:User {username: $username})-[r:RELATES_TO]->(:Information) "
+    "WITH collect(DISTINCT r.value_lower) AS values "
+    "RETURN CASE WHEN size(values) <= $max_values THEN values END AS values"
+)
+
+# Bounds on the working set of find_similar_information's Cypher reads
+MAX_RELEVANT_TEXTS = 64  # max Milvus texts passed as `$texts`
+MAX_QUERY_LIMIT = 200  # hard cap on any per-query LIMIT derived from top_k
+
+# Fused find_similar_information read (Queries 1-3 as one UNION ALL inside CALL {}, deduplicated by
+# (rel_id, hier_id) server-side and returned ordered by branch, then recency). Kept as a module constant so the
+# statement text is byte-identical across calls and Neo4j's plan cache always hits; user data only
+# ever travels as $params.
+CONTEXT_RECORDS_QUERY = """
+CALL {
+    MATCH (u:User {username: $username})-[r:RELATES_TO]->(i:Information)
+    WHERE r.value IN $relevant_texts OR i.value IN $relevant_texts
+    OPTIONAL MATCH (i)-[h:HAS_CATEGORY]->(j:Information)
+    RETURN
+        'q1' AS source,
+        elementId(r) AS rel_id,
+        toLower(r.value) AS relationship,
+        toLower(i.key) AS node_key,
+        toLower(i.value) AS node_value,
+        i.createdAt AS created_at,
+        r.lifetime AS lifetime,
+        elementId(h) AS hier_id,
+        toLower(j.key) AS category_key,
+        toLower(j.value) AS category_value,
+        j.createdAt AS category_created_at
+    ORDER BY created_at DESC
+    LIMIT $initial_limit
+
+    UNION ALL
+
+    MATCH (u:User {username: $username})-[r:RELATES_TO]->(parent:Information)-[h:HAS_CATEGORY]->(child:Information)
+    RETURN
+        'q2' AS source,
+        elementId(h) AS rel_id,
+        toLower(type(h)) AS relationship,
+        toLower(child.key) AS node_key,
+        toLower(child.value) AS node_value,
+        child.createdAt AS created_at,
+        '' AS lifetime,
+        null AS hier_id,
+        null AS category_key,
+        null AS category_value,
+        null AS category_created_at
+    ORDER BY created_at DESC
+    LIMIT $limit
+
+    UNION ALL
+
+    UNWIND $texts AS text
+    MATCH (u:User {username: $username})-[r:RELATES_TO]->(i:Information)
+    WHERE r.value_lower CONTAINS text
+    WITH DISTINCT r, i
+    RETURN
+        'q3' AS source,
+        elementId(r) AS rel_id,
+        toLower(r.value) AS relationship,
+        toLower(i.key) AS node_key,
+        toLower(i.value) AS node_value,
+        i.createdAt AS created_at,
+        r.lifetime AS lifetime,
+        null AS hier_id,
+        null AS category_key,
+        null AS category_value,
+        null AS category_created_at
+    ORDER BY created_at DESC
+    LIMIT $limit
+}
+// Deduplicate rows across branches in the server, keeping the highest-priority branch (q1 > q2 > q3).
+// hier_id is part of the key so a q1 node with several categories keeps one row per category hop
+WITH source, rel_id, relationship, node_key, node_value, created_at, lifetime, hier_id, category_key, category_value, category_created_at
+ORDER BY source, created_at DESC
+WITH rel_id, hier_id, head(collect({source: source, relationship: relationship, node_key: node_key, node_value: node_value, created_at: created_at, lifetime: lifetime, category_key: category_key, category_value: category_value, category_created_at: category_created_at})) AS row
+RETURN
+    row.source AS source,
+    rel_id,
+    row.relationship AS relationship,
+    row.node_key AS node_key,
+    row.node_value AS node_value,
+    row.created_at AS created_at,
+    row.lifetime AS lifetime,
+    hier_id,
+    row.category_key AS category_key,
+    row.category_value AS category_value,
+    row.category_created_at AS category_created_at
+ORDER BY source, created_at DESC
+"""
+
+# Placeholder parameters for planning CONTEXT_RECORDS_QUERY with EXPLAIN at startup
+CONTEXT_RECORDS_WARMUP_PARAMS = {"username": "", "relevant_texts": [], "texts": [], "initial_limit": 1, "limit": 1}
+
+# Constraints and indexes ensured at startup, keyed by name; vector indexes live in Milvus
+NEO4J_SCHEMA_QUERIES = {
+    "user_username": "CREATE CONSTRAINT user_username IF NOT EXISTS FOR (u:User) REQUIRE u.username IS UNIQUE",
+    "information_value": "CREATE CONSTRAINT information_value IF NOT EXISTS FOR (i:Information) REQUIRE i.value IS UNIQUE",
+    # Lowercased relationship verb, written on every RELATES_TO merge, backs substring matching
+    "rel_value_lower": "CREATE TEXT INDEX rel_value_lower IF NOT EXISTS FOR ()-[r:RELATES_TO]-() ON (r.value_lower)",
+    "schema_migration_name": "CREATE CONSTRAINT schema_migration_name IF NOT EXISTS FOR (m:SchemaMigration) REQUIRE m.name IS UNIQUE",
+}
+
+# Data migrations are recorded on (:SchemaMigration {name, version}) marker nodes, so each runs once per
+# version instead of on every startup
+SCHEMA_MIGRATION_VERSION_QUERY = "MATCH (m:SchemaMigration {name: $name}) RETURN m.version AS version"
+SCHEMA_MIGRATION_MARK_QUERY = (
+    "MERGE (m:SchemaMigration {name: $name}) "
+    "SET m.version = $version, m.appliedAt = timestamp() "
+    "RETURN m.version AS version"
+)
+REL_VALUE_LOWER_MIGRATION = "rel_value_lower"
+# Tracks normalize_text: a change there re-runs the value_lower backfill exactly once
+REL_VALUE_LOWER_VERSION = NORMALIZE_TEXT_VERSION
+
+# Backfill of r.value_lower (normalize_text of r.value) for relationships written before the property existed
+# or with an older normalization; runs only while the rel_value_lower marker is behind REL_VALUE_LOWER_VERSION. Cypher has no NFKC/casefold, so the values are normalized in Python:
+# read the distinct (value, value_lower) pairs, then set only the stale ones via a {value: normalized} map
+REL_VALUE_LOWER_PAIRS_QUERY = (
+    "MATCH ()-[r:RELATES_TO]->() WHERE r.value IS NOT NULL "
+    "RETURN DISTINCT r.value AS value, r.value_lower AS value_lower"
+)
+REL_VALUE_LOWER_BACKFILL_QUERY = (
+    "MATCH ()-[r:RELATES_TO]->() WHERE r.value IN keys($normalized) "
+    "WITH r, $normalized[r.value] AS normalized WHERE r.value_lower IS NULL OR r.value_lower <> normalized "
+    "SET r.value_lower = normalized "
+    "RETURN count(r) AS updated"
+)
+
+# OpenAI client settings: a larger keep-alive pool so concurrent requests reuse warm
+# TLS connections instead of queueing on the default limits
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+# Transient failures (429 / 5xx / connection errors) are retried by the SDK with exponential
+# backoff that honors Retry-After, instead of surfacing as dropped embeddings
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+
+def _create_openai_client() -> AsyncOpenAI:
+    """Build the embeddings client; owned by Neo4jService, which creates it in connect() and closes it in close()."""
+    return AsyncOpenAI(
+        max_retries=OPENAI_MAX_RETRIES,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_CONNECTIONS),
+            timeout=60.0,
+        )
+    )
+
+# Embedding cache / batching configuration
+EMBEDDING_CACHE_PREFIX = "kw_emb_f32n:"  # keys are hashes of normalized text, values packed float32 bytes
+EMBEDDING_CACHE_TTL = 86400  # cache for 1 day
+OPENAI_EMBEDDING_BATCH_SIZE = 512  # inputs per embeddings request (API max 2048); keeps each request well under the token budget
+OPENAI_EMBEDDING_CONCURRENCY = 5  # max embeddings requests in flight per process, to stay clear of 429s
+EMBEDDING_MEMORY_CACHE_SIZE = 4096  # in-process LRU entries checked before Redis
+
+# Process-wide LRU of embeddings keyed by normalized text. Only touched from the event loop
+# without awaiting in between, so no lock is needed.
+_embedding_memory_cache: "OrderedDict[str, list[float]]" = OrderedDict()
 
-aclient = AsyncOpenAI()
+# Caps concurrent embeddings requests across all callers in this process
+_embedding_request_semaphore = asyncio.Semaphore(OPENAI_EMBEDDING_CONCURRENCY)
 
 # Singleton Redis client for embedding cache
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
 _redis_client: aioredis.Redis | None = None
 
 def get_redis_client() -> aioredis.Redis:
@@ -34,216 +220,439 @@ def get_redis_client() -> aioredis.Redis:
     global _redis_client
     if _redis_client is None:
         redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        _redis_client = aioredis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+        # Shared, explicitly sized pool so concurrent cache calls don't queue on the default limit.
+        # Binary responses: cached embeddings are raw float32 buffers
+        pool = aioredis.ConnectionPool.from_url(
+            redis_url,
+            decode_responses=False,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            socket_keepalive=True,
+            health_check_interval=30,
+        )
+        _redis_client = aioredis.Redis(connection_pool=pool)
     return _redis_client
 
-# Async helper functions for Neo4j database operations
-
-async def _async_run_write_query(driver: AsyncDriver, query: str, params: Dict[str, Any] = None):
-    """Runs a write query within a session and returns the result summary asynchronously."""
-    try:
-        async with driver.session(database="neo4j") as session:
-            result = await session.run(query, params)
-            summary = await result.consume()
-            return summary
-    except Exception as e:
-        logger.error(f"Async write query failed: {query} | Params: {params} | Error: {e}", exc_info=True)
-        raise
-
-async def _async_fetch_single(driver: AsyncDriver, query: str, params: Dict[str, Any] = None):
-    """Runs a query and fetches a single record asynchronously."""
-    try:
-        async with driver.session(database="neo4j") as session:
-            result = await session.run(query, params)
-            record = await result.single()
-            return record
-    except Exception as e:
-        logger.error(f"Async fetch single failed: {query} | Params: {params} | Error: {e}", exc_info=True)
-        raise
-
-async def _async_fetch_list(driver: AsyncDriver, query: str, params: Dict[str, Any] = None):
-    """Runs a query and fetches a list of records asynchronously."""
-    try:
-        async with driver.session(database="neo4j") as session:
-            result = await session.run(query, params)
-            records = [record async for record in result]
-            return records
-    except Exception as e:
-        logger.error(f"Async fetch list failed: {query} | Params: {params} | Error: {e}", exc_info=True)
-        raise
-
-async def _async_create_node_get_id(driver: AsyncDriver, query: str, params: Dict[str, Any] = None) -> int | None:
-    """Runs a query to create/merge a node and returns its internal Neo4j ID asynchronously."""
+def _embedding_cache_key(text_key: str) -> str:
+    """Build a fixed-size Redis key for a normalized text by hashing it (BLAKE2b, 128-bit)."""
+    key_hash = hashlib.blake2b(text_key.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{EMBEDDING_CACHE_PREFIX}{key_hash}"
+
+def _is_embeddable(text_key: str) -> bool:
+    """Whether a normalized text carries any content worth embedding (at least one alphanumeric char)."""
+    return any(c.isalnum() for c in text_key)
+
+def _memory_cache_get(text_key: str) -> list[float] | None:
+    """Return an embedding from the in-process LRU, marking it most recently used."""
+    embedding = _embedding_memory_cache.get(text_key)
+    if embedding is not None:
+        _embedding_memory_cache.move_to_end(text_key)
+    return embedding
+
+def _memory_cache_put(text_key: str, embedding: list[float]):
+    """Store an embedding in the in-process LRU, evicting the least recently used entries."""
+    _embedding_memory_cache[text_key] = embedding
+    _embedding_memory_cache.move_to_end(text_key)
+    while len(_embedding_memory_cache) > EMBEDDING_MEMORY_CACHE_SIZE:
+        _embedding_memory_cache.popitem(last=False)
+
+async def _embed_chunk(client: AsyncOpenAI, chunk: list[str]) -> dict[str, list[float]]:
+    """Embed one chunk of texts in a single OpenAI request, bounded by the shared semaphore.
+       Returns {text: embedding}; errors are logged and yield an empty result for the chunk."""
     try:
-        async with driver.session(database="neo4j") as session:
-            result = await session.run(query, params)
-            record = await result.single()
-            return record[0] if record else None
+        async with _embedding_request_semaphore:
+            response = await client.embeddings.create(input=chunk, model=OPENAI_EMBEDDING_MODEL)
+        return {chunk[item.index]: item.embedding for item in response.data}
+    except OpenAIError as e:
+        logger.error(f"OpenAI API error generating {len(chunk)} embeddings: {e}")
     except Exception as e:
-        logger.error(f"Async create node get ID failed: {query} | Params: {params} | Error: {e}", exc_info=True)
-        raise
-
-async def _async_create_relationship_get_id(driver: AsyncDriver, query: str, params: Dict[str, Any] = None) -> int | None:
-    """Runs a query to create/merge a relationship and returns its internal Neo4j ID asynchronously."""
-    try:
-        async with driver.session(database="neo4j") as session:
-            result = await session.run(query, params)
-            record = await result.single()
-            return record[0] if record else None
-    except Exception as e:
-        logger.error(f"Async create relationship get ID failed: {query} | Params: {params} | Error: {e}", exc_info=True)
-        raise
+        logger.error(f"Unexpected error generating {len(chunk)} embeddings: {e}", exc_info=True)
+    return {}
+
+def _pack_embedding(embedding: list[float]) -> bytes:
+    """Serialize an embedding as packed float32 bytes (~6 KB for 1536 dims vs ~27 KB of JSON)."""
+    return array("f", embedding).tobytes()
+
+def _unpack_embedding(data: bytes) -> list[float]:
+    """Deserialize packed float32 bytes written by _pack_embedding (zero-copy view, one tolist())."""
+    return memoryview(data).cast("f").tolist()
+
+@lru_cache(maxsize=4096)
+def _ms_to_iso(ms: int | float) -> str:
+    """Format a Neo4j timestamp() value (epoch ms) as an ISO-8601 string; memoized since
+       the same createdAt values recur across context lookups."""
+    return datetime.fromtimestamp(ms / 1000).isoformat()
+
+def _format_created_at(created_at: Any) -> str:
+    """ISO-8601 string for a createdAt value, falling back to str() for non-numeric or out-of-range values."""
+    if isinstance(created_at, (int, float)):
+        try: return _ms_to_iso(created_at)
+        except Exception: pass
+    return str(created_at)
+
+def _format_context_row(row: CONTEXT_ROW) -> Tuple[str, ...]:
+    """Context sentence(s) for one CONTEXT_ROW: two for a 2-hop category chain, one otherwise.
+       Not memoized: rows carry unique rel_ids, and repeated lookups are already served by the context cache."""
+    _, relationship, node_key, node_value, created_at, lifetime, parent_rel, parent_val = row
+    created_iso = _format_created_at(created_at)
+    if parent_rel and parent_val:
+        # Sentence 1: user->parent ("You ..." is already capitalized); sentence 2: parent->child category
+        pv_cap = parent_val[:1].upper() + parent_val[1:]
+        return (
+            f"You {parent_rel} {parent_val}, recorded around {created_iso}, lifetime {lifetime or ''}.",
+            f"{pv_cap} is a {node_key or ''} of {node_value or ''}.",
+        )
+    return (f"You {relationship} {node_value}, recorded around {created_iso}, lifetime {lifetime or ''}.",)
+
+# Transaction functions for managed transactions (session.execute_read / execute_write)
+
+async def _tx_fetch_single(tx, query: str, params: Dict[str, Any] = None):
+    """Transaction function: runs a query and returns a single record."""
+    result = await tx.run(query, params)
+    return await result.single()
+
+async def _tx_fetch_list(tx, query: str, params: Dict[str, Any] = None):
+    """Transaction function: runs a query and returns all records as a list."""
+    result = await tx.run(query, params)
+    return [record async for record in result]
+
+# Result transformers for driver.execute_query
+
+async def _partition_context_rows(result) -> Tuple[List[CONTEXT_ROW], List[CONTEXT_ROW], List[CONTEXT_ROW]]:
+    """Result transformer for CONTEXT_RECORDS_QUERY: streams the rows (records are tuples in RETURN
+       column order) and folds them into (q1 rows incl. category hops, q2 rows, q3 rows)."""
+    initial_rows, child_rows, edge_rows = [], [], []
+    async for (source, rel_id, relationship, node_key, node_value, created_at, lifetime,
+               hier_id, category_key, category_value, category_created_at) in result:
+        row = (rel_id, relationship, node_key, node_value, created_at, lifetime, None, None)
+        if source == "q2":
+            child_rows.append(row)
+            continue
+        if source == "q3":
+            edge_rows.append(row)
+            continue
+        initial_rows.append(row)
+        if hier_id is not None:
+            # 2-hop chain: user->node and node->category, formatted as two sentences
+            initial_rows.append((
+                hier_id, "HAS_CATEGORY", category_key, category_value, category_created_at, "",
+                relationship, node_value,
+            ))
+    return initial_rows, child_rows, edge_rows
 
 # Core class: Neo4jService - handles graph operations and embedding workflows
 
 class Neo4jService:
     """Service managing the Neo4j driver lifecycle, graph queries, and embedding workflows."""
     _driver: AsyncDriver | None = None
-    # Lock to synchronize Milvus vector checks and insertions
-    _milvus_insert_lock = asyncio.Lock()
+    _redis: aioredis.Redis | None = None # Embedding cache client, bound in connect()
+    _openai: AsyncOpenAI | None = None # Embeddings client, created in connect() and closed in close()
+
+    def __init__(self):
+        # Serializes connect()/close() so concurrent startups build one driver
+        self._connect_lock = asyncio.Lock()
+        # TTL LRU of formatted context: {(username, keywords, top_k, threshold): (expires_at, sentences)}
+        self._context_cache: "OrderedDict[tuple, Tuple[float, List[str]]]" = OrderedDict()
+        # TTL LRU of each user's distinct normalized relationship values: {username: (expires_at, values)}.
+        # The TTL bounds staleness from writers outside this process, which never invalidate it
+        # (values None: the user has too many values to prefilter with)
+        self._rel_values_cache: "OrderedDict[str, Tuple[float, Tuple[str, ...] | None]]" = OrderedDict()
+        # Per-user write generation, bumped on every invalidation, so a read that started before a
+        # save can tell its result is stale and skip caching it: {username: generation}
+        self._cache_generations: Dict[str, int] = {}
+
+    def _context_cache_get(self, key: tuple) -> List[str] | None:
+        """Return cached context sentences for key if present and not expired."""
+        entry = self._context_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, sentences = entry
+        if expires_at < time.monotonic():
+            del self._context_cache[key]
+            return None
+        self._context_cache.move_to_end(key)
+        return list(sentences)
+
+    def _context_cache_put(self, key: tuple, sentences: List[str]):
+        """Store context sentences for key, evicting the least recently used entries."""
+        self._context_cache[key] = (time.monotonic() + CONTEXT_CACHE_TTL, list(sentences))
+        self._context_cache.move_to_end(key)
+        while len(self._context_cache) > CONTEXT_CACHE_SIZE:
+            self._context_cache.popitem(last=False)
+
+    def _invalidate_context_cache(self, username: str):
+        """Drop every cached context and the relationship value set for a user after their graph changed."""
+        for key in [key for key in self._context_cache if key[0] == username]:
+            del self._context_cache[key]
+        self._rel_values_cache.pop(username, None)
+        self._cache_generations[username] = self._cache_generations.get(username, 0) + 1
+
+    async def _get_rel_values(self, driver: AsyncDriver, username: str) -> Tuple[str, ...] | None:
+        """The user's distinct normalized relationship values, cached for CONTEXT_CACHE_TTL and dropped on writes.
+           Returns None (probe every text) if they could not be loaded or exceed REL_VALUES_PREFILTER_MAX."""
+        entry = self._rel_values_cache.get(username)
+        if entry is not None:
+            expires_at, values = entry
+            if expires_at >= time.monotonic():
+                self._rel_values_cache.move_to_end(username)
+                return values
+            del self._rel_values_cache[username]
+        generation = self._cache_generations.get(username, 0)
+        try:
+            records, _, _ = await driver.execute_query(
+                USER_REL_VALUES_QUERY, {"username": username, "max_values": REL_VALUES_PREFILTER_MAX},
+                routing_=RoutingControl.READ, database_=NEO4J_DATABASE,
+            )
+        except Exception as e:
+            logger.warning(f"Could not load relationship values for user '{username}', probing all texts: {e}")
+            return None
+        if not records:
+            values = ()
+        elif records[0]["values"] is None:
+            values = None # Too many values: the cached None skips the prefilter for this user until expiry
+        else:
+            values = tuple(records[0]["values"])
+        if self._cache_generations.get(username, 0) != generation:
+            return values # A save landed while loading; use the values once but don't cache them
+        self._rel_values_cache[username] = (time.monotonic() + CONTEXT_CACHE_TTL, values)
+        self._rel_values_cache.move_to_end(username)
+        while len(self._rel_values_cache) > REL_VALUES_CACHE_SIZE:
+            self._rel_values_cache.popitem(last=False)
+        return values
 
     async def connect(self):
-        """Establishes an async driver connection to Neo4j and verifies connectivity."""
-        if self._driver is None:
+        """Establishes an async driver connection to Neo4j, verifies connectivity, and binds the Redis cache client."""
+        async with self._connect_lock:
+            if self._redis is None:
+                self._redis = get_redis_client()
+            if self._openai is None:
+                self._openai = _create_openai_client()
+            if self._driver is not None:
+                return
+            driver = None
             try:
-                logger.info(f"Attempting to connect to Neo4j at {NEO4J_URI}")
-                self._driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-                await self._driver.verify_connectivity()
+                logger.info(
+                    f"Attempting to connect to Neo4j at {NEO4J_URI} (pool size {NEO4J_MAX_POOL_SIZE}, "
+                    f"acquisition timeout {NEO4J_ACQ_TIMEOUT}s)"
+                )
+                driver = AsyncGraphDatabase.driver(
+                    NEO4J_URI,
+                    auth=(NEO4J_USER, NEO4J_PASSWORD),
+                    max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                    connection_acquisition_timeout=NEO4J_ACQ_TIMEOUT,
+                    max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+                    connection_timeout=NEO4J_CONNECTION_TIMEOUT,
+                    keep_alive=True,
+                )
+                await driver.verify_connectivity()
+                # Published only once verified, so callers never see a half-initialized driver
+                self._driver = driver
                 logger.info("Neo4j connection successful.")
             except Exception as e:
                 logger.error(f"Failed to connect to Neo4j or verify connectivity: {e}", exc_info=True)
-                self._driver = None
+                if driver is not None:
+                    await driver.close() # Release the pool of the driver that failed verification
                 raise
 
     async def close(self):
-        if self._driver is not None:
-            await self._driver.close()
-            logger.info("Neo4j connection closed.")
-            self._driver = None
+        async with self._connect_lock:
+            if self._driver is not None:
+                await self._driver.close()
+                logger.info("Neo4j connection closed.")
+                self._driver = None
+            # Release the OpenAI client's pooled keep-alive connections; a later connect() builds a fresh one
+            if self._openai is not None:
+                await self._openai.close()
+                self._openai = None
 
     def get_driver(self) -> AsyncDriver:
         if self._driver is None:
             raise ConnectionError("Neo4j driver is not initialized. Call connect() first.")
         return self._driver
 
-    async def generate_embedding(self, text: str) -> list[float]:
-        """Generates embedding for the given text using OpenAI API with Redis caching."""
+    def _session(self) -> AsyncSession:
+        """Open a session on NEO4J_DATABASE that shares the driver's execute_query bookmark manager,
+           so managed-transaction writes and execute_query reads are causally chained (read-your-writes)."""
+        driver = self.get_driver()
+        return driver.session(database=NEO4J_DATABASE, bookmark_manager=driver.execute_query_bookmark_manager)
+
+    async def generate_embedding(self, text: str) -> list[float] | None:
+        """Generates embedding for the given text using OpenAI API with Redis caching.
+           Shares the MGET / pipelined SET cache path of generate_embeddings_batch.
+           Returns None for empty text or on failure."""
         if not text:
             logger.warning("generate_embedding called with empty text.")
-            return [0.0] * EMBEDDING_DIMENSION
-
-        text_key = text.replace("\n", " ").strip()
-        cache_key = f"kw_embedding:{text_key}"
-        redis_client = get_redis_client()
-        try:
-            cached = await redis_client.get(cache_key)
-            if cached:
-                logger.debug(f"Embedding cache hit for text: '{text_key[:50]}...'")
-                return json.loads(cached)
-        except Exception as e:
-            logger.error(f"Redis cache get error for key {cache_key}: {e}", exc_info=True)
+            return None
+        embeddings = await self.generate_embeddings_batch([text])
+        return embeddings[0]
+
+    async def generate_embeddings_batch(self, texts: list[str]) -> list[list[float] | None]:
+        """Generates embeddings for many texts: in-process LRU first, then one Redis MGET for the
+           rest, then as few OpenAI requests as possible.
+           Returns vectors aligned with `texts`; failed or empty texts map to None."""
+        if not texts:
+            return []
 
-        try:
-            response = await aclient.embeddings.create(
-                input=[text_key],
-                model=OPENAI_EMBEDDING_MODEL
-            )
-            embedding = response.data[0].embedding
+        text_keys = [normalize_text(text) if text else "" for text in texts]
+        # Empty, whitespace-only and punctuation-only texts map to None without an API call
+        unique_keys = [key for key in dict.fromkeys(text_keys) if key and _is_embeddable(key)]
+        vectors: dict[str, list[float]] = {}
+        redis_client = self._redis if self._redis is not None else get_redis_client()
+        if self._openai is None:
+            self._openai = _create_openai_client() # Used before connect(); close() still releases it
+        openai_client = self._openai
+
+        # 1. Serve what we can from the in-process LRU, skipping Redis entirely for those texts
+        for key in unique_keys:
+            embedding = _memory_cache_get(key)
+            if embedding is not None:
+                vectors[key] = embedding
+
+        # 2. Fetch every remaining cached embedding in a single round-trip
+        redis_keys = [key for key in unique_keys if key not in vectors]
+        if redis_keys:
             try:
-                await redis_client.set(cache_key, json.dumps(embedding), ex=86400)  # cache for 1 day
+                cached_values = await redis_client.mget([_embedding_cache_key(key) for key in redis_keys])
+                for key, cached in zip(redis_keys, cached_values):
+                    if cached:
+                        vectors[key] = _unpack_embedding(cached)
+                        _memory_cache_put(key, vectors[key])
+                logger.debug(f"Embedding cache hits: {len(vectors)}/{len(unique_keys)}")
             except Exception as e:
-                logger.error(f"Redis cache set error for key {cache_key}: {e}", exc_info=True)
-            return embedding
-        except OpenAIError as e:
-            logger.error(f"OpenAI API error generating embedding for text '{text_key[:50]}...': {e}")
-            return [0.0] * EMBEDDING_DIMENSION
-        except Exception as e:
-            logger.error(f"Unexpected error generating embedding: {e}", exc_info=True)
-            return [0.0] * EMBEDDING_DIMENSION
+                logger.error(f"Redis cache mget error for {len(redis_keys)} keys: {e}", exc_info=True)
+
+        # 3. Embed the cache misses, chunked and dispatched concurrently (bounded by the shared semaphore)
+        missing_keys = [key for key in unique_keys if key not in vectors]
+        new_vectors: dict[str, list[float]] = {}
+        chunks = [missing_keys[start:start + OPENAI_EMBEDDING_BATCH_SIZE] for start in range(0, len(missing_keys), OPENAI_EMBEDDING_BATCH_SIZE)]
+        for chunk_vectors in await asyncio.gather(*(_embed_chunk(openai_client, chunk) for chunk in chunks)):
+            new_vectors.update(chunk_vectors)
+
+        # 4. Write the new embeddings back in one pipelined round-trip
+        if new_vectors:
+            vectors.update(new_vectors)
+            for key, embedding in new_vectors.items():
+                _memory_cache_put(key, embedding)
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                for key, embedding in new_vectors.items():
+                    pipe.set(_embedding_cache_key(key), _pack_embedding(embedding), ex=EMBEDDING_CACHE_TTL)
+                await pipe.execute()
+            except Exception as e:
+                logger.error(f"Redis cache pipeline set error for {len(new_vectors)} keys: {e}", exc_info=True)
+
+        return [vectors.get(key) for key in text_keys]
 
     async def create_indexes(self):
-        """Ensure unique constraints in Neo4j; vector indexing is performed by Milvus."""
+        """Ensure unique constraints and the RELATES_TO text index in Neo4j; vector indexing is performed by Milvus.
+           Each schema statement runs in its own transaction (a failed statement would abort any transaction
+           it shared), then r.value_lower is backfilled and the context query is planned once to warm the plan cache."""
         driver = self.get_driver()
-        
-        constraint_queries = [
-            "CREATE CONSTRAINT user_username IF NOT EXISTS FOR (u:User) REQUIRE u.username IS UNIQUE",
-            "CREATE CONSTRAINT information_value IF NOT EXISTS FOR (i:Information) REQUIRE i.value IS UNIQUE", # Reverted to value only constraint
-            # "CREATE CONSTRAINT information_key_value IF NOT EXISTS FOR (i:Information) REQUIRE (i.key, i.value) IS UNIQUE" # Removed composite constraint
-        ]
-        # Removed Neo4j vector index creation queries
-        
+        # Independent statements, applied concurrently; one failing never affects the others
+        results = await asyncio.gather(
+            *(driver.execute_query(query, database_=NEO4J_DATABASE) for query in NEO4J_SCHEMA_QUERIES.values()),
+            return_exceptions=True,
+        )
+        for schema_name, result in zip(NEO4J_SCHEMA_QUERIES, results):
+            if isinstance(result, Exception):
+                 logger.warning(f"Schema item '{schema_name}' creation failed: {result}")
+            else:
+                 logger.info(f"Schema item '{schema_name}' creation attempted.")
+
+        # Data writes can't share a transaction with schema changes, so the backfill runs separately
+        await self._migrate_rel_value_lower()
+
+        # Plan the hot context query once so the first user request finds it in the plan cache
         try:
-            # Run both constraint creations
-            tasks = [_async_run_write_query(driver, query) for query in constraint_queries]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Log results
-            for query, result in zip(constraint_queries, results):
-                constraint_name = query.split(" ")[2] # Extract name for logging
-                if isinstance(result, Exception):
-                     logger.warning(f"Constraint '{constraint_name}' creation failed or thread execution error: {result}")
-                else:
-                     logger.info(f"Constraint '{constraint_name}' creation attempted (run in thread).")
+            async with self._session() as session:
+                await session.execute_read(_tx_fetch_list, "EXPLAIN " + CONTEXT_RECORDS_QUERY, CONTEXT_RECORDS_WARMUP_PARAMS)
+            logger.info("Warmed Neo4j plan cache for the context query.")
         except Exception as e:
-            # This catch might be redundant now with gather handling exceptions, but kept for safety
-            logger.warning(f"Error during constraint creation process: {e}")
+            logger.warning(f"Error warming Neo4j plan cache: {e}")
 
         logger.info("Neo4j index creation step skipped (vector indexes moved to Milvus).")
 
+    async def _migrate_rel_value_lower(self):
+        """Backfill r.value_lower once per REL_VALUE_LOWER_VERSION, gated on its SchemaMigration marker.
+           Every RELATES_TO merge writes value_lower, so once the marker is current there is nothing to scan.
+           The marker is only advanced after the backfill succeeds, so a failed run is retried on the next startup."""
+        try:
+            async with self._session() as session:
+                marker = await session.execute_read(
+                    _tx_fetch_single, SCHEMA_MIGRATION_VERSION_QUERY, {"name": REL_VALUE_LOWER_MIGRATION}
+                )
+                if marker is not None and marker["version"] == REL_VALUE_LOWER_VERSION:
+                    logger.info(f"RELATES_TO value_lower is at version {REL_VALUE_LOWER_VERSION}; no backfill needed.")
+                    return
+                pairs = await session.execute_read(_tx_fetch_list, REL_VALUE_LOWER_PAIRS_QUERY)
+                stale = {
+                    record["value"]: normalize_text(record["value"])
+                    for record in pairs
+                    if record["value_lower"] != normalize_text(record["value"])
+                }
+                record = None
+                if stale:
+                    record = await session.execute_write(_tx_fetch_single, REL_VALUE_LOWER_BACKFILL_QUERY, {"normalized": stale})
+                await session.execute_write(
+                    _tx_fetch_single, SCHEMA_MIGRATION_MARK_QUERY,
+                    {"name": REL_VALUE_LOWER_MIGRATION, "version": REL_VALUE_LOWER_VERSION},
+                )
+            logger.info(
+                f"Backfilled value_lower on {record['updated'] if record else 0} RELATES_TO relationships "
+                f"(version {REL_VALUE_LOWER_VERSION})."
+            )
+        except Exception as e:
+            # Edge matching and the probe prefilter read value_lower, so unmigrated relationships drop out of context
+            logger.error(f"Error backfilling RELATES_TO value_lower; older relationships may be missing from edge matching: {e}", exc_info=True)
+
     async def add_user(self, username: str, user_info: dict):
-        """Creates or updates a User node using sync calls in threads."""
-        driver = self.get_driver()
+        """Creates or updates a User node in a managed write transaction; returns its username, or None on failure."""
         query = (
             "MERGE (u:User {username: $username}) "
             "ON CREATE SET u += $props, u.createdAt = timestamp() "
             "ON MATCH SET u += $props, u.updatedAt = timestamp() "
-            "RETURN u"
+            "RETURN u.username AS username"
         )
         props = {"email": user_info.get("email")}
         props = {k: v for k, v in props.items() if v is not None}
         try:
-            record = await _async_fetch_single(driver, query, params={"username": username, "props": props})
+            # Managed write transaction: the driver retries it on transient errors
+            async with self._session() as session:
+                record = await session.execute_write(_tx_fetch_single, query, {"username": username, "props": props})
             if record:
-                logger.info(f"User node '{username}' created or updated in Neo4j (run in thread).")
-                return record[0] # Return the node object/dict from the record
+                logger.info(f"User node '{username}' created or updated in Neo4j.")
+                return record["username"] # Only the username is projected; the node itself is never shipped
             else:
                 logger.warning(f"User node '{username}' could not be created/updated.")
                 return None
         except Exception as e:
-            logger.error(f"Error adding user '{username}' via thread: {e}", exc_info=True)
+            logger.error(f"Error adding user '{username}' to Neo4j: {e}", exc_info=True)
             return None
 
     async def save_personal_information(self, username: str, info_list: list[dict]):
         """Merge personal info into Neo4j and manage vector storage:
            1) Merge nodes/relationships in Neo4j.
            2) Generate/cache embeddings.
-           3) Insert new vectors into Milvus."""
-        driver = self.get_driver()
-        
-        # 1. Check if user exists (remains the same)
-        user_check_query = "MATCH (u:User {username: $username}) RETURN u.username"
-        try:
-            user_record = await _async_fetch_single(driver, user_check_query, params={"username": username})
-            if not user_record:
-                logger.error(f"User '{username}' not found in Neo4j. Cannot save info.")
-                return False
-        except Exception as e:
-            logger.error(f"Error checking user '{username}': {e}", exc_info=True)
-            return False
+           3) Insert new vectors into Milvus.
+           All Neo4j work for the request shares one session."""
+        async with self._session() as session:
+            return await self._save_personal_information(session, username, info_list)
 
+    async def _save_personal_information(self, session: AsyncSession, username: str, info_list: list[dict]):
+        """Body of save_personal_information, running its Neo4j work on the given session."""
         # --- Refactored Processing Logic --- 
-        neo4j_update_tasks = [] # Tasks to update Neo4j with Milvus IDs later
-        milvus_insertion_data = [] # Data for new vectors to insert into Milvus
-        embedding_cache = {} # Cache generated embeddings for reuse within this request
-        milvus_id_cache = {} # Cache Milvus IDs found for existing texts
-        processed_neo4j_ids = {} # Track Neo4j IDs created: {('node', text): id, ('rel', text): id}
+        milvus_insertion_data: dict[str, dict] = {} # New vectors to upsert into Milvus, keyed by normalized text
+        # Embeddings generated by this request, keyed by normalized text. Repeat lookups across requests
+        # are served by the process and Redis caches behind generate_embeddings_batch.
+        new_embeddings: dict[str, list[float]] = {}
 
         # --- Pass 1: Check Milvus, generate embeddings for new texts, create Neo4j elements --- 
         logger.debug(f"Starting Pass 1 for user '{username}': Check Milvus, Embed new, Create Neo4j")
         
-        # Collect all unique texts that might need checking/embedding first
-        texts_to_potentially_process = set()
+        # Collect all unique texts that might need checking/embedding first, keyed by their
+        # normalized form so case/whitespace variants share one embedding and one Milvus lookup
+        texts_to_potentially_process: dict[str, str] = {} # {normalized text: canonical original}
         valid_info_list = []
+        seen_items = set() # (key, value, relationship) triples already kept; extraction often repeats items
         for info in info_list:
             key_str = info.get("key")
             value = info.get("value")
@@ -251,226 +660,180 @@ class Neo4jService:
             if not all([key_str, value, relationship_verb]):
                 logger.warning(f"Skipping incomplete item for user '{username}': {info}")
                 continue
+            item_key = (key_str, value, relationship_verb)
+            if item_key in seen_items:
+                continue
+            seen_items.add(item_key)
             valid_info_list.append(info) # Keep track of valid items
-            texts_to_potentially_process.add(value) # Node text
-            texts_to_potentially_process.add(relationship_verb) # Relationship text
-            texts_to_potentially_process.add(key_str) # Key/Category text
-
-        # Determine which texts actually need embedding (check Milvus within lock)
-        embeddings_needed = {} # {text: type}
-        async with self._milvus_insert_lock: # Acquire lock
-            logger.debug(f"Acquired lock to check Milvus for {len(texts_to_potentially_process)} potential texts.")
-            # Check local cache first (in case texts repeat within the batch)
-            texts_to_check_in_milvus = {t for t in texts_to_potentially_process if t not in milvus_id_cache}
-            
-            if texts_to_check_in_milvus:
-                # Batch check would be ideal, doing sequential for now
-                check_tasks = {text: milvus_service.get_vector_id_by_text(text) for text in texts_to_check_in_milvus}
-                results = await asyncio.gather(*check_tasks.values(), return_exceptions=True)
-                
-                for i, text in enumerate(check_tasks.keys()):
-                    result = results[i]
-                    if isinstance(result, Exception):
-                        logger.error(f"Error checking Milvus for text '{text}': {result}")
-                        # Decide how to handle - skip text? Assume not present?
-                        # Assuming not present for now to allow potential insertion
-                        embeddings_needed[text] = None # Mark as needing embedding, type resolved later
-                    elif result is not None:
-                        milvus_id_cache[text] = result # Cache existing ID
-                        logger.debug(f"Milvus check found existing ID for text: '{text}'")
-                    else:
-                        # Text is new according to Milvus
-                        embeddings_needed[text] = None # Mark as needing embedding, type resolved later
-                        logger.debug(f"Milvus check found no vector for text: '{text}'")
-            logger.debug(f"Releasing lock. {len(embeddings_needed)} texts marked for potential embedding.")
-
-        # --- Generate Embeddings (Outside Lock) --- 
-        if embeddings_needed:
-            embedding_tasks = {}
-            for text in embeddings_needed.keys():
-                if text not in embedding_cache: # Avoid re-generating
-                    embedding_tasks[text] = self.generate_embedding(text)
-            
-            if embedding_tasks:
-                logger.debug(f"Generating embeddings for {len(embedding_tasks)} texts.")
-                embedding_results = await asyncio.gather(*embedding_tasks.values(), return_exceptions=True)
-                for i, text in enumerate(embedding_tasks.keys()):
-                    result = embedding_results[i]
-                    if isinstance(result, Exception) or not any(result):
-                        logger.error(f"Failed to generate embedding for text '{text}': {result}. Will not add to Milvus.")
-                        # Remove from embeddings_needed if failed?
-                        if text in embeddings_needed:
-                             del embeddings_needed[text] 
-                    else:
-                        embedding_cache[text] = result
-                        logger.debug(f"Successfully generated embedding for text: '{text}'")
-            else:
-                logger.debug("No new embeddings needed (all texts needing embedding were already cached).")
-        else:
-            logger.debug("No texts needed embedding generation.")
-
-        # --- Process each valid info item: Create Neo4j & Prepare Milvus Insert Data --- 
-        for info in valid_info_list:
-            key_str = info.get("key")
-            value = info.get("value")
-            relationship_verb = info.get("relationship")
-            lifetime = info.get("lifetime", "permanent")
-            node_text = value
-            rel_text = relationship_verb
-            
-            # --- Check for existing Information node by value or key (not necessarily both) ---
-            neo4j_node_id = None
+            texts_to_potentially_process.setdefault(normalize_text(value), value) # Node text
+            texts_to_potentially_process.setdefault(normalize_text(relationship_verb), relationship_verb) # Relationship text
+            texts_to_potentially_process.setdefault(normalize_text(key_str), key_str) # Key/Category text
+        if len(valid_info_list) < len(info_list):
+            logger.debug(f"Kept {len(valid_info_list)} of {len(info_list)} info items for user '{username}' after dropping incomplete and duplicate ones")
+        if not valid_info_list:
+            # Nothing to merge, so the merge can't double as the user check; verify the user explicitly
             try:
-                find_existing_query = (
-                    "MATCH (i:Information) "
-                    "WHERE i.value = $value OR i.key = $key "
-                    "RETURN elementId(i) AS node_id, i.key AS old_key, i.value AS old_value"
+                user_record = await session.execute_read(
+                    _tx_fetch_single, "MATCH (u:User {username: $username}) RETURN 1 AS found", {"username": username}
                 )
-                existing_node = await _async_fetch_single(driver, find_existing_query, {"key": key_str, "value": value})
-                if existing_node:
-                    neo4j_node_id = existing_node["node_id"]
-                    # If the existing node was a category node but is now being used as a general node, update its key to the new key
-                    if existing_node["old_key"] == "Category" and key_str != "Category":
-                        update_key_query = (
-                            "MATCH (i:Information) WHERE elementId(i) = $node_id SET i.key = $key, i.updatedAt = timestamp() RETURN elementId(i)"
-                        )
-                        await _async_run_write_query(driver, update_key_query, {"node_id": neo4j_node_id, "key": key_str})
-                else:
-                    # 없으면 새로 생성
-                    create_node_query = (
-                        "CREATE (i:Information {key: $key, value: $value, createdAt: timestamp(), children: []}) "
-                        "RETURN elementId(i)"
-                    )
-                    node_params = {"key": key_str, "value": value}
-                    neo4j_node_id = await _async_create_node_get_id(driver, create_node_query, node_params)
-                    if neo4j_node_id is None: raise ValueError(f"Failed to create/get node ID for {value}")
             except Exception as e:
-                logger.error(f"Error checking/creating/updating Information node for key='{key_str}', value='{value}': {e}", exc_info=True)
-                continue
+                logger.error(f"Error checking user '{username}' in Neo4j: {e}", exc_info=True)
+                return False
+            if user_record is None:
+                logger.error(f"User '{username}' not found in Neo4j. Cannot save info.")
+                return False
+            logger.info(f"No valid info items to save for user '{username}'.")
+            return True
+
+        # Determine which texts actually need embedding. No lock is needed: Milvus writes are
+        # upserts keyed on original_text, so a concurrent request embedding the same text is harmless.
+        embeddings_needed = [] # Normalized texts with no vector in Milvus yet
+        texts_to_check_in_milvus = list(texts_to_potentially_process)
 
-            # --- Create/Merge Neo4j Elements --- 
-            neo4j_rel_id = None
-            neo4j_key_node_id = None
+        if texts_to_check_in_milvus:
+            # One batched Milvus query instead of one RPC per text
             try:
-                if neo4j_node_id:
-                    neo4j_node_id = neo4j_node_id
+                existing_ids = await milvus_service.get_vector_ids_by_texts(texts_to_check_in_milvus)
+            except Exception as e:
+                # Assume not present to allow potential insertion
+                logger.error(f"Error checking Milvus for {len(texts_to_check_in_milvus)} texts: {e}")
+                existing_ids = {}
+
+            for text in texts_to_check_in_milvus:
+                if existing_ids.get(text) is not None:
+                    logger.debug("Milvus check found existing ID for text: %r", text) # Lazy args: no formatting per text below DEBUG
                 else:
-                    # Step 2a: Node
-                    create_node_query = (
-                        "MERGE (i:Information {key: $key, value: $value}) "
-                        "ON CREATE SET i.createdAt = timestamp(), i.children = [] "
-                        "ON MATCH SET i.updatedAt = timestamp() "
-                        "RETURN elementId(i)"
-                    )
-                    node_params = {"key": key_str, "value": value}
-                    neo4j_node_id = await _async_create_node_get_id(driver, create_node_query, node_params)
-                    if neo4j_node_id is None: raise ValueError(f"Failed to create/get node ID for {value}")
-
-                # Step 2b: Relationship
-                create_rel_query = (
-                    "MATCH (u:User {username: $username}) "
-                    "MATCH (i:Information) WHERE elementId(i) = $node_id " 
-                    "MERGE (u)-[r:RELATES_TO {value: $relationship_verb}]->(i) "
-                    "ON CREATE SET r.lifetime = $lifetime, r.createdAt = timestamp() "
-                    "ON MATCH SET r.lifetime = $lifetime, r.updatedAt = timestamp() " 
-                    "RETURN elementId(r)"
-                )
-                rel_params = {"username": username, "node_id": neo4j_node_id, "relationship_verb": relationship_verb, "lifetime": lifetime}
-                neo4j_rel_id = await _async_create_relationship_get_id(driver, create_rel_query, rel_params)
-                if neo4j_rel_id is None: logger.error(f"Failed to create/get relationship ID for {rel_text} -> {node_text}") # Log error but continue
-
-                # Step 2c: Key Node & Hierarchy
-                key_node_key_prop = "Category"
-                key_node_params = {"key_node_key": key_node_key_prop, "key_value": key_str}
-                # Merge Category node by value to respect unique constraint on value
-                merge_key_node_query = (
-                    "MERGE (k:Information {value: $key_value}) "
-                    "ON CREATE SET k.key = $key_node_key, k.createdAt = timestamp(), k.children = [] "
-                    "ON MATCH SET k.key = $key_node_key, k.updatedAt = timestamp() "
-                    "RETURN elementId(k) AS key_node_id"
-                )
-                record = await _async_fetch_single(driver, merge_key_node_query, key_node_params)
-                neo4j_key_node_id = record["key_node_id"] if record else None
-                if neo4j_key_node_id is None:
-                    logger.error(f"Failed to merge key node ID for key='{key_str}'")
-                    continue
-                
-                create_hierarchy_rel_query = (
-                    "MATCH (i:Information) WHERE elementId(i) = $node_id "
-                    "MATCH (k:Information) WHERE elementId(k) = $key_node_id "
-                    "MERGE (i)-[h:HAS_CATEGORY]->(k) "
-                    "ON CREATE SET h.createdAt = timestamp() "
-                    "ON MATCH SET h.updatedAt = timestamp()"
-                )
-                hierarchy_rel_params = {"node_id": neo4j_node_id, "key_node_id": neo4j_key_node_id}
-                await _async_run_write_query(driver, create_hierarchy_rel_query, hierarchy_rel_params)
+                    # Text is new according to Milvus
+                    embeddings_needed.append(text) # Element type is resolved when building the insertion data
+                    logger.debug("Milvus check found no vector for text: %r", text)
+        logger.debug(f"{len(embeddings_needed)} texts marked for potential embedding.")
 
+        # --- Generate Embeddings --- 
+        if embeddings_needed:
+            logger.debug(f"Generating embeddings for {len(embeddings_needed)} texts in one batch.")
+            try:
+                embedding_results = await self.generate_embeddings_batch(
+                    [texts_to_potentially_process[text] for text in embeddings_needed]
+                )
             except Exception as e:
-                logger.error(f"Error during Neo4j element creation/linking for info key='{key_str}', value='{value}': {e}. Skipping Milvus prep for this item.", exc_info=True)
-                continue # Skip Milvus prep for this item if Neo4j failed
-
-            # --- Prepare Milvus Insertion Data (Add if new & embedding succeeded) ---
-            if node_text in embeddings_needed and node_text in embedding_cache:
-                 milvus_insertion_data.append({
-                     "embedding": embedding_cache[node_text],
-                     "element_type": "Node",
-                     "original_text": node_text.lower()
-                 })
-                 del embeddings_needed[node_text] # Mark as processed for insertion
-                 
-            if rel_text in embeddings_needed and rel_text in embedding_cache and neo4j_rel_id is not None: # Check rel was created
-                 milvus_insertion_data.append({
-                     "embedding": embedding_cache[rel_text],
-                     "element_type": "Relationship",
-                     "original_text": rel_text.lower()
-                 })
-                 del embeddings_needed[rel_text] # Mark as processed
-                 
-            if key_str in embeddings_needed and key_str in embedding_cache:
-                 milvus_insertion_data.append({
-                     "embedding": embedding_cache[key_str],
-                     "element_type": "Node", 
-                     "original_text": key_str.lower()
-                 })
-                 del embeddings_needed[key_str] # Mark as processed
-
-        # --- Pass 2: Batch Insert New Vectors into Milvus, filtering out duplicates ---
-        if milvus_insertion_data:
-            # Deduplicate insertion data by original_text
-            deduped_items = {item["original_text"].lower(): item for item in milvus_insertion_data}.values()
-            logger.debug(f"Attempting to insert {len(deduped_items)} unique new vectors into Milvus.")
-            # Filter out items that already exist in Milvus by exact text match
-            filtered_items = []
-            for item in deduped_items:
-                text = item["original_text"].lower()
-                item["original_text"] = text
-                try:
-                    existing_id = await milvus_service.get_vector_id_by_text(text)
-                    if existing_id is not None:
-                        logger.debug(f"Skipping insertion for '{text}' because it already exists in Milvus.")
-                        continue
-                except Exception as e:
-                    logger.error(f"Error checking Milvus for existing text '{text}': {e}", exc_info=True)
-                filtered_items.append(item)
-            if filtered_items:
-                logger.debug(f"{len(filtered_items)} vectors remain after filtering existing duplicates.")
-                try:
-                    inserted_ids = await milvus_service.insert_vectors(filtered_items)
-                    # Logging success/failure based on count
-                    if inserted_ids and len(inserted_ids) == len(filtered_items):
-                        logger.info(f"Successfully inserted {len(inserted_ids)} new vectors into Milvus.")
-                    else:
-                        logger.error(f"Milvus insertion failed or returned incorrect ID count. Expected {len(filtered_items)}, got {len(inserted_ids) if inserted_ids else 0}.")
-                except Exception as e:
-                    logger.error(f"Failed during Milvus batch insertion: {e}", exc_info=True)
-            else:
-                logger.debug("No new vectors to insert after filtering existing duplicates.")
+                logger.error(f"Batch embedding generation failed: {e}", exc_info=True)
+                embedding_results = [e] * len(embeddings_needed)
+            for text, result in zip(embeddings_needed, embedding_results):
+                if result is None or isinstance(result, Exception):
+                    logger.error(f"Failed to generate embedding for text '{text}': {result}. Will not add to Milvus.")
+                else:
+                    new_embeddings[text] = result
+                    logger.debug("Successfully generated embedding for text: %r", text)
         else:
-            logger.debug("Pass 2 Skipped: No new vectors needed insertion.")
+            logger.debug("No texts needed embedding generation.")
+
+        # --- Prepare Milvus Insertion Data (texts that were new and embedded successfully) ---
+        for info in valid_info_list:
+            node_norm = normalize_text(info.get("value"))
+            rel_norm = normalize_text(info.get("relationship"))
+            key_norm = normalize_text(info.get("key"))
+
+            # First element type seen for a text wins; later occurrences are no-ops
+            if node_norm in new_embeddings:
+                milvus_insertion_data.setdefault(node_norm, {
+                    "embedding": new_embeddings[node_norm],
+                    "element_type": "Node",
+                    "original_text": node_norm
+                })
+            if rel_norm in new_embeddings:
+                milvus_insertion_data.setdefault(rel_norm, {
+                    "embedding": new_embeddings[rel_norm],
+                    "element_type": "Relationship",
+                    "original_text": rel_norm
+                })
+            if key_norm in new_embeddings:
+                milvus_insertion_data.setdefault(key_norm, {
+                    "embedding": new_embeddings[key_norm],
+                    "element_type": "Node",
+                    "original_text": key_norm
+                })
+
+        # --- Create/Merge all Neo4j elements in a single UNWIND write transaction ---
+        # Information nodes are merged by value (unique constraint); an existing Category node
+        # reused as a general node takes the new key, mirroring the previous per-item logic.
+        # The leading MATCH doubles as the user existence check: no user, no rows, no writes.
+        merge_info_query = """
+        MATCH (u:User {username: $username})
+        UNWIND $rows AS row
+        MERGE (i:Information {value: row.value})
+        ON CREATE SET i.key = row.key, i.createdAt = timestamp(), i.children = []
+        ON MATCH SET i.key = CASE WHEN i.key = 'Category' AND row.key <> 'Category' THEN row.key ELSE i.key END,
+                     i.updatedAt = timestamp()
+        MERGE (u)-[r:RELATES_TO {value: row.relationship}]->(i)
+        ON CREATE SET r.lifetime = row.lifetime, r.createdAt = timestamp(), r.value_lower = row.value_lower
+        ON MATCH SET r.lifetime = row.lifetime, r.updatedAt = timestamp(), r.value_lower = row.value_lower
+        MERGE (k:Information {value: row.key})
+        ON CREATE SET k.key = 'Category', k.createdAt = timestamp(), k.children = []
+        ON MATCH SET k.key = 'Category', k.updatedAt = timestamp()
+        MERGE (i)-[h:HAS_CATEGORY]->(k)
+        ON CREATE SET h.createdAt = timestamp()
+        ON MATCH SET h.updatedAt = timestamp()
+        RETURN
+            row.value AS value,
+            row.relationship AS relationship,
+            row.key AS key,
+            elementId(i) AS node_id,
+            elementId(r) AS rel_id,
+            elementId(k) AS key_node_id
+        """
+        rows = [
+            {
+                "key": info.get("key"),
+                "value": info.get("value"),
+                "relationship": info.get("relationship"),
+                "value_lower": normalize_text(info.get("relationship")), # Same form as the edge probe texts
+                "lifetime": info.get("lifetime", "permanent"),
+            }
+            for info in valid_info_list
+        ]
+        # Pass 2 (Milvus upsert of the new vectors) runs only once the graph write has succeeded, so no vectors
+        # are written for a failed merge or a missing user, and the upsert always completes (recording the
+        # new texts in Milvus' known-text cache) rather than being abandoned mid-thread.
+        try:
+            merge_records = await session.execute_write(
+                _tx_fetch_list, merge_info_query, {"username": username, "rows": rows}
+            )
+        except Exception as e:
+            logger.error(f"Error during batched Neo4j element creation/linking for user '{username}': {e}", exc_info=True)
+            # Conservatively drop the user's cached context even though the transaction rolled back
+            self._invalidate_context_cache(username)
+            return False
+        if not merge_records:
+            # The leading MATCH found no user: nothing was written, and the upsert below is skipped
+            logger.error(f"User '{username}' not found in Neo4j. Cannot save info.")
+            return False
+        logger.debug(f"Merged {len(merge_records)} info items into Neo4j for user '{username}' in one query.")
+        await self._upsert_new_vectors(milvus_insertion_data)
+        # The user's graph changed; drop their cached context
+        self._invalidate_context_cache(username)
 
         logger.info(f"Finished saving personal information for user '{username}'.")
         return True # Indicate overall process completion
 
+    async def _upsert_new_vectors(self, milvus_insertion_data: dict[str, dict]):
+        """Pass 2 of save_personal_information: batch upsert new vectors into Milvus. Errors are logged here."""
+        if not milvus_insertion_data:
+            logger.debug("Pass 2 Skipped: No new vectors needed insertion.")
+            return
+        # Already unique by original_text; texts already in Milvus were excluded by the
+        # batched lookup in pass 1, so no per-item re-check is needed here
+        filtered_items = list(milvus_insertion_data.values())
+        logger.debug(f"Attempting to insert {len(filtered_items)} unique new vectors into Milvus.")
+        try:
+            upserted_ids = await milvus_service.upsert_vectors(filtered_items)
+            # Logging success/failure based on count
+            if upserted_ids and len(upserted_ids) == len(filtered_items):
+                logger.info(f"Successfully upserted {len(upserted_ids)} new vectors into Milvus.")
+            else:
+                logger.error(f"Milvus upsert failed or returned incorrect ID count. Expected {len(filtered_items)}, got {len(upserted_ids) if upserted_ids else 0}.")
+        except Exception as e:
+            logger.error(f"Failed during Milvus batch upsert: {e}", exc_info=True)
+
     async def find_similar_information(self, username: str, keywords: List[str], top_k: int = 3, similarity_threshold: float = 0.75) -> List[str]:
         """Retrieve context by combining vector search and graph traversal:
            - Embed keywords and search Milvus.
@@ -479,13 +842,26 @@ class Neo4jService:
         if not keywords:
             return []
 
-        driver = self.get_driver()
-        logger.info(f"Finding similar info for '{username}' via keywords: {keywords}, using 1-hop children expansion.")
+        # Repeated context fetches within a chat session are served from memory
+        cache_key = (username, tuple(sorted(set(keywords))), top_k, similarity_threshold)
+        cached_sentences = self._context_cache_get(cache_key)
+        if cached_sentences is not None:
+            logger.info("Context cache hit for '%s' via keywords: %s.", username, keywords) # Lazy args: formatted only if INFO is enabled
+            return cached_sentences
+        generation = self._cache_generations.get(username, 0)
 
-        # 1. Generate embeddings for keywords (remains same)
-        embedding_tasks = [self.generate_embedding(kw) for kw in keywords]
-        keyword_embeddings = await asyncio.gather(*embedding_tasks)
-        valid_embeddings = [emb for emb in keyword_embeddings if any(emb)]
+        driver = self.get_driver()
+        logger.info("Finding similar info for '%s' via keywords: %s, using 1-hop children expansion.", username, keywords)
+
+        # 1. Generate embeddings for the unique keywords in one batch (duplicates from the
+        #    extraction step would otherwise each pay a cache lookup and add a redundant query vector)
+        unique_keywords = list(dict.fromkeys(keywords))
+        #    The user's relationship values (needed for the edge probe in step 3) load concurrently,
+        #    overlapping the Neo4j round-trip with the embedding lookup
+        keyword_embeddings, rel_values = await asyncio.gather(
+            self.generate_embeddings_batch(unique_keywords), self._get_rel_values(driver, username)
+        )
+        valid_embeddings = [emb for emb in keyword_embeddings if emb is not None]
         if not valid_embeddings:
             logger.warning(f"No valid keyword embeddings for '{username}'. Keywords: {keywords}")
             return []
@@ -500,217 +876,109 @@ class Neo4jService:
             if not milvus_results:
                 logger.info(f"No similar text concepts found in Milvus.")
                 return []
-            relevant_texts = list(set([hit['original_text'] for hit in milvus_results if hit.get('original_text')]))
-            logger.info(f"Milvus found {len(relevant_texts)} relevant text concepts: {relevant_texts}")
+            # Hits arrive sorted by score; keep the best MAX_RELEVANT_TEXTS unique texts so the
+            # Cypher `IN $texts` filters below run over a bounded list
+            relevant_texts = list(dict.fromkeys(hit['original_text'] for hit in milvus_results if hit.get('original_text')))[:MAX_RELEVANT_TEXTS]
+            logger.info("Milvus found %d relevant text concepts: %s", len(relevant_texts), relevant_texts)
         except Exception as e:
             logger.error(f"Error searching Milvus concepts: {e}", exc_info=True)
             return []
 
-        # 3. Neo4j Query 1: Find initial nodes and their children based on Milvus texts
-        child_keywords = set() 
-        initial_neo4j_data = []
-        if relevant_texts:
-            try:
-                # Query to find initial nodes connected to the user matching Milvus texts
-                # AND retrieve their children property
-                query1 = """
-                MATCH (u:User {username: $username})-[r:RELATES_TO]->(i:Information)
-                WHERE r.value IN $texts OR i.value IN $texts
-                RETURN
-                    elementId(r) AS rel_id,
-                    r.value AS relationship,
-                    i.key AS node_key,
-                    i.value AS node_value,
-                    i.createdAt AS created_at,
-                    r.lifetime AS lifetime,
-                    i.children AS children
-                    , '' AS parent_relationship
-                    , '' AS parent_value
-
-                UNION ALL
-
-                MATCH (u:User {username: $username})-[r:RELATES_TO]->(i:Information)-[h:HAS_CATEGORY]->(j:Information)
-                WHERE (r.value IN $texts OR i.value IN $texts) AND NOT j:User
-                RETURN
-                    elementId(h) AS rel_id,
-                    type(h) AS relationship,
-                    j.key AS node_key,
-                    j.value AS node_value,
-                    j.createdAt AS created_at,
-                    '' AS lifetime,
-                    j.children AS children,
-                    r.value AS parent_relationship,
-                    i.value AS parent_value
-
-                ORDER BY created_at DESC
-                LIMIT $limit
-                """
-                query1_results = await _async_fetch_list(driver, query1,
-                    params={"username": username, "texts": relevant_texts, "limit": top_k * 5} # Fetch more initially
-                )
-                
-                if query1_results:
-                    initial_neo4j_data.extend(query1_results)
-                    # Extract child keywords from results
-                    for record in query1_results:
-                        children_list = record.get("children")
-                        if children_list and isinstance(children_list, list):
-                            for child in children_list:
-                                if isinstance(child, str) and child.strip():
-                                    child_keywords.add(child.strip())
-                    logger.info(f"Query 1 found {len(initial_neo4j_data)} initial nodes/rels. Extracted children: {child_keywords}")
-                else:
-                    logger.info(f"Query 1 found no initial nodes/rels matching Milvus texts for user '{username}'.")
-
-            except Exception as e:
-                logger.error(f"Error in Neo4j Query 1 for user '{username}': {e}", exc_info=True)
-                # Continue without initial results if query fails?
-
-        # 4. Neo4j Query 2: Find child concepts via HAS_CATEGORY from user's nodes
-        child_neo4j_data = []
-        try:
-            # Query 2: Find child concepts via HAS_CATEGORY from user's nodes
-            query2 = """
-            MATCH (u:User {username: $username})-[r:RELATES_TO]->(parent:Information)-[h:HAS_CATEGORY]->(child:Information)
-            RETURN
-                elementId(h) AS rel_id,
-                type(h) AS relationship,
-                child.key AS node_key,
-                child.value AS node_value,
-                child.createdAt AS created_at,
-                '' AS lifetime
-            ORDER BY child.createdAt DESC
-            LIMIT $limit
-            """
-            query2_results = await _async_fetch_list(driver, query2,
-                params={"username": username, "limit": top_k * 3}
-            )
-            if query2_results:
-                child_neo4j_data.extend(query2_results)
-                logger.info(f"Query 2 found {len(child_neo4j_data)} direct child nodes for user '{username}'.")
-            else:
-                logger.info(f"Query 2 found no direct child nodes for user '{username}'.")
-        except Exception as e:
-            logger.error(f"Error in Neo4j Query 2 (direct children) for user '{username}': {e}", exc_info=True)
-
-        # 5. Neo4j Query 3: Find edges that contain similar information
-        edge_neo4j_data = []
-        try:
-            # Query to find edges that have properties similar to the keywords or relevant texts
-            query3 = """
-            MATCH (u:User {username: $username})-[r:RELATES_TO]->(i:Information)
-            WHERE any(text IN $texts WHERE r.value CONTAINS text) 
-               OR any(text IN $texts WHERE toLower(r.value) CONTAINS toLower(text))
-            RETURN 
-                elementId(r) AS rel_id, 
-                r.value AS relationship, 
-                i.key AS node_key, 
-                i.value AS node_value, 
-                i.createdAt AS created_at, 
-                r.lifetime AS lifetime
-            ORDER BY i.createdAt DESC
-            LIMIT $limit
-            """
-            query3_results = await _async_fetch_list(driver, query3,
-                params={
-                    "username": username, 
-                    "texts": relevant_texts + keywords,  # Search in both relevant texts and original keywords
-                    "limit": top_k * 3
-                }
-            )
-            if query3_results:
-                edge_neo4j_data.extend(query3_results)
-                logger.info(f"Query 3 found {len(edge_neo4j_data)} edges/relationships with similar information.")
-            else:
-                logger.info(f"Query 3 found no edges with similar information for user '{username}'.")
-        except Exception as e:
-            logger.error(f"Error in Neo4j Query 3 (edges) for user '{username}': {e}", exc_info=True)
-
-        # 6. Combine, Deduplicate, and Format Results
-        final_results_map = {}
-        # Process initial results first
-        for record in initial_neo4j_data:
-            rel_id = record["rel_id"]
-            if rel_id not in final_results_map: # Use relationship ID as unique key for now
-                final_results_map[rel_id] = dict(record)
-        # Add results from child keyword search
-        for record in child_neo4j_data:
-             rel_id = record["rel_id"]
-             if rel_id not in final_results_map:
-                 final_results_map[rel_id] = dict(record)
-        # Add results from edge similarity search
-        for record in edge_neo4j_data:
-             rel_id = record["rel_id"]
-             if rel_id not in final_results_map:
-                 final_results_map[rel_id] = dict(record)
-
-        # Sort combined results (optional, using node creation time as primary sort key from queries)
-        # sorted_results = sorted(final_results_map.values(), key=lambda x: x.get("created_at", 0), reverse=True)
-        # Or just use the map directly as order might be good enough from individual queries
-        sorted_results = list(final_results_map.values())
-
+        # 3-5. Neo4j Queries 1-3 fused into one round-trip, partitioned by source afterwards.
+        #      The probe is normalized (normalize_text, as r.value_lower is) and deduplicated once here, so the Cypher compares it as-is. Texts no
+        #      relationship value can contain are dropped (all are kept if the values failed to load or number more
+        #      than REL_VALUES_PREFILTER_MAX, which bounds the scan below); an empty probe makes Query 3 a no-op
+        edge_probe_texts = list(dict.fromkeys(key for key in (normalize_text(text) for text in chain(relevant_texts, keywords) if text) if key))
+        if rel_values is not None:
+            edge_probe_texts = [text for text in edge_probe_texts if any(text in value for value in rel_values)]
+        context_records = await self._query_context_records(driver, username, relevant_texts, edge_probe_texts, top_k)
+        if context_records is None:
+            return [] # Not cached: a transient Neo4j error must not pin an empty context for the TTL
+        initial_neo4j_data, child_neo4j_data, edge_neo4j_data = context_records
+
+        # 6. Combine, deduplicate by relationship ID and format in one sequential pass over the three lists
+        #    (first occurrence wins: initial, child, then edge results). Neo4j already drops most overlap;
+        #    the rel_id set catches what its (rel_id, hier_id) key can't, e.g. q1 rows with a category hop
+        #    repeated by q3, and category hops derived from q1 repeating a q2 rel_id.
+        seen_rel_ids = set()
         output_sentences = []
         seen_tuples = set() # Deduplicate based on core info
-        for record_dict in sorted_results:
-            if len(output_sentences) >= top_k:
+        # Loop-invariant lookups bound to locals (LOAD_FAST instead of global/attribute lookups per row)
+        append = output_sentences.append
+        format_row = _format_context_row
+        for row in chain(initial_neo4j_data, child_neo4j_data, edge_neo4j_data):
+            remaining = top_k - len(output_sentences)
+            if remaining <= 0:
                 break
+            rel_id, relationship, node_key, node_value, created_at, lifetime, parent_rel, parent_val = row
+            seen_count = len(seen_rel_ids)
+            seen_rel_ids.add(rel_id)
+            if len(seen_rel_ids) == seen_count:
+                continue
+            # Text columns arrive lowercased from Cypher (toLower in RETURN), ready for interpolation.
+            # Cheap rejections run first; formatting only for rows that are emitted.
 
             # 2-hop chain handling: if parent info present, emit two sentences
-            parent_rel = record_dict.get('parent_relationship')
-            parent_val = record_dict.get('parent_value')
-            # timestamp and lifetime
-            created_at = record_dict.get("created_at")
-            if isinstance(created_at, (int, float)):
-                try: created_iso = datetime.fromtimestamp(created_at / 1000).isoformat()
-                except Exception: created_iso = str(created_at)
-            else: created_iso = str(created_at)
-            lifetime = record_dict.get("lifetime", "")
             if parent_rel and parent_val:
-                pr = parent_rel.lower()
-                pv = parent_val.lower()
-                # Sentence 1: user->parent
-                sent1 = (
-                    f"You {pr} {pv}, "
-                    f"recorded around {created_iso}, lifetime {lifetime}."
-                )
-                sent1 = sent1[0].upper() + sent1[1:]
-                output_sentences.append(sent1)
-                if len(output_sentences) >= top_k:
+                # A chain that would overflow top_k is dropped whole rather than cut after its first sentence
+                if remaining < 2 and output_sentences:
                     break
-                # Sentence 2: parent->child category
-                key = record_dict.get('node_key', '').lower()
-                cv = record_dict.get('node_value', '').lower()
-                sent2 = f"{pv.capitalize()} is a {key} of {cv}."
-                output_sentences.append(sent2)
-                if len(output_sentences) >= top_k:
+                parent_sentence, category_sentence = format_row(row)
+                append(parent_sentence)
+                if remaining < 2:
                     break
+                append(category_sentence)
                 continue
+
             # default one-sentence generation
-            rel_verb = record_dict.get('relationship', '').lower()
-            node_val = record_dict.get('node_value', '').lower()
-            node_key = record_dict.get('node_key', '').lower()
-            info_tuple = (rel_verb, node_val, node_key)
-
-            if not all([rel_verb, node_val]) or info_tuple in seen_tuples:
-                continue 
-            seen_tuples.add(info_tuple)
-
-            created_at = record_dict.get("created_at")
-            if isinstance(created_at, (int, float)):
-                try: created_iso = datetime.fromtimestamp(created_at / 1000).isoformat()
-                except Exception: created_iso = str(created_at)
-            else: created_iso = str(created_at)
-            lifetime = record_dict.get("lifetime", "")
-
-            sentence = (
-                f"You {rel_verb} {node_val}, "
-                f"recorded around {created_iso}, lifetime {lifetime}."
-            )
-            sentence = sentence[0].upper() + sentence[1:]
-            output_sentences.append(sentence)
+            if not relationship or not node_value:
+                continue
+            # Single hash probe: add() and detect a duplicate by the set not growing
+            seen_count = len(seen_tuples)
+            seen_tuples.add((relationship, node_value, node_key or ''))
+            if len(seen_tuples) == seen_count:
+                continue
 
-        logger.info(f"Formatted {len(output_sentences)} unique context sentences after keywords, children, and edge expansion for user '{username}'.")
+            append(format_row(row)[0])
+
+        logger.info("Formatted %d unique context sentences after keywords, children, and edge expansion for user '%s'.", len(output_sentences), username)
+        # Skip the put if the user's graph changed while this read was in flight; the result may predate it
+        if self._cache_generations.get(username, 0) == generation:
+            self._context_cache_put(cache_key, output_sentences)
         return output_sentences
 
+    async def _query_context_records(self, driver: AsyncDriver, username: str, relevant_texts: List[str], texts: List[str], top_k: int) -> Tuple[List[CONTEXT_ROW], List[CONTEXT_ROW], List[CONTEXT_ROW]] | None:
+        """Run Queries 1-3 as one UNION ALL statement and split the rows by their `source` column:
+             q1 - nodes matching the Milvus texts, plus their category hop
+             q2 - child concepts via HAS_CATEGORY from the user's nodes
+             q3 - edges whose r.value_lower contains any of `texts` (which must already be normalized)
+           Each branch keeps its own ORDER BY / LIMIT; overlapping rows are dropped server-side. Rows come back as CONTEXT_ROW tuples with
+           relationship / key / value text already lowercased server-side.
+           Returns None on failure; errors are logged here."""
+        params = {
+            "username": username,
+            "relevant_texts": relevant_texts,
+            "texts": texts, # Normalized relevant texts and original keywords
+            "initial_limit": min(top_k * 5, MAX_QUERY_LIMIT), # Fetch more initially
+            "limit": min(top_k * 3, MAX_QUERY_LIMIT),
+        }
+        try:
+            # driver.execute_query routes to a reader with the database pinned and manages the session itself;
+            # the transformer folds rows into the partitions as they stream in, without materializing records
+            initial_neo4j_data, child_neo4j_data, edge_neo4j_data = await driver.execute_query(
+                CONTEXT_RECORDS_QUERY, params, routing_=RoutingControl.READ, database_=NEO4J_DATABASE,
+                result_transformer_=_partition_context_rows,
+            )
+        except Exception as e:
+            logger.error(f"Error in fused Neo4j context query for user '{username}': {e}", exc_info=True)
+            return None
+
+        logger.info(
+            "Context query for user '%s': %d initial nodes/rels (incl. category hops), %d direct child nodes, "
+            "%d edges with similar information.",
+            username, len(initial_neo4j_data), len(child_neo4j_data), len(edge_neo4j_data),
+        )
+        return initial_neo4j_data, child_neo4j_data, edge_neo4j_data
+
 # Global instance
 neo4j_service = Neo4jService()
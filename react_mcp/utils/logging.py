@@ -1,9 +1,14 @@
+import os
 import sys
+import atexit
 import logging
 from logging.config import dictConfig
 
 def setup_logging():
-    """Configure root logger via dictConfig"""
+    """Configure root logger via dictConfig; the root level comes from LOG_LEVEL (default INFO).
+       Loggers enqueue records on a QueueHandler, and a background QueueListener thread does the
+       stdout writes, so request handlers never block on the write syscall."""
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
     dictConfig({
         "version": 1,
         "disable_existing_loggers": False,
@@ -20,17 +25,26 @@ def setup_logging():
                 "class": "logging.StreamHandler",
                 "stream": sys.stdout,
             },
+            "queue": {
+                "class": "logging.handlers.QueueHandler",
+                "handlers": ["default"],
+                "respect_handler_level": True,
+            },
         },
         "loggers": {
             "": {
-                "handlers": ["default"],
-                "level": "INFO",
+                "handlers": ["queue"],
+                "level": level,
             },
             "uvicorn.error": {"level": "INFO"},
             "uvicorn.access": {
-                "handlers": ["default"],
+                "handlers": ["queue"],
                 "level": "INFO",
                 "propagate": False,
             },
         },
-    }) 
\ No newline at end of file
+    }) 
+    # dictConfig builds the QueueListener but leaves starting it to us; stop it at exit to flush queued records
+    listener = logging.getHandlerByName("queue").listener
+    listener.start()
+    atexit.register(listener.stop)